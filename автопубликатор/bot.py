@@ -1,11 +1,20 @@
 import os
+import re
+import html
 import logging
 import random
-import requests
 import asyncio
-from datetime import datetime
+import time
+from functools import partial
+from itertools import islice
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from io import BytesIO
+from types import MappingProxyType
 from typing import Dict, Optional, Tuple, List
 
+import aiohttp
+
 from telegram import (
     Update,
     InlineKeyboardButton,
@@ -22,9 +31,11 @@ from telegram.ext import (
     MessageHandler,
     filters
 )
+from telegram.error import BadRequest, Forbidden, RetryAfter
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import feedparser
+from lxml import etree
 
 # Настройка логов
 logging.basicConfig(
@@ -33,8 +44,127 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Общий лимит ожидания RSS-лент (секунды)
+RSS_TOTAL_TIMEOUT = 5
+# Время жизни кэша RSS-лент (секунды) и его максимальный размер
+RSS_CACHE_TTL = 300
+RSS_CACHE_SIZE = 64
+# Максимум одновременных фоновых предзагрузок статей
+PREFETCH_LIMIT = 4
+# Не чаще одного сообщения об ошибке за этот интервал (секунды)
+ERROR_NOTICE_INTERVAL = 5
+# Сколько file_id загруженных в Telegram изображений помнить
+FILE_ID_CACHE_SIZE = 256
+
+# Регулярные выражения для очистки HTML в описаниях
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACE_RE = re.compile(r'\s+')
+
+# Поиск изображения на странице статьи
+_OG_IMAGE_SELECTOR = 'meta[property="og:image"], meta[property="twitter:image"], meta[name="twitter:image"]'
+_IMG_EXT = ('.jpg', '.jpeg', '.png', '.webp')
+# Сколько байт страницы читать: мета-теги почти всегда в начале <head>
+ARTICLE_READ_LIMIT = 64 * 1024
+
+# Подписи кнопок главного меню (кнопки категорий берутся из CATEGORIES)
+RANDOM_BUTTON = "📰 Случайная новость"
+HELP_BUTTON = "ℹ️ Помощь"
+
+
+def _fast_parse(body: bytes, limit: int = 10) -> List[Tuple[str, str, str]]:
+    """Быстрый разбор RSS/Atom: только заголовок, ссылка и описание"""
+    entries = []
+    for _, elem in etree.iterparse(
+        BytesIO(body), tag=('{*}item', '{*}entry'), huge_tree=False, resolve_entities=False
+    ):
+        # Поля ищем в пространстве имен самой записи, а не в atom:link, media:title и т.п.
+        ns = elem.tag[:elem.tag.index('}') + 1] if elem.tag.startswith('{') else ''
+        if elem.tag.endswith('entry'):
+            # В Atom ссылка - атрибут href, нужна rel="alternate" (или без rel)
+            link = next(
+                (
+                    link_el.get('href', '')
+                    for link_el in elem.iterfind(ns + 'link')
+                    if link_el.get('rel', 'alternate') == 'alternate'
+                ),
+                ''
+            ).strip()
+        else:
+            # В RSS ссылка - текст тега
+            link = (elem.findtext(ns + 'link') or '').strip()
+        
+        summary = (
+            elem.findtext(ns + 'description')
+            or elem.findtext(ns + 'summary')
+            or elem.findtext(ns + 'content')
+            or ''
+        )
+        entries.append(((elem.findtext(ns + 'title') or '').strip(), link, summary))
+        
+        elem.clear()
+        if len(entries) >= limit:
+            break
+    return entries
+
+
+def _parse_feed(body: bytes, limit: int = 10) -> List[Tuple[str, str, str]]:
+    """Разбор ленты через lxml с запасным вариантом на feedparser"""
+    try:
+        entries = _fast_parse(body, limit)
+        if entries:
+            return entries
+    except Exception as e:
+        logger.debug(f"Быстрый парсер не справился: {str(e)}")
+    
+    return [
+        (entry.get('title', ''), entry.get('link', ''), entry.get('summary', entry.get('description', '')))
+        for entry in islice(feedparser.parse(body).entries, limit)
+    ]
+
 load_dotenv()
 
+# Настройки категорий с резервными RSS (общие для всех экземпляров бота)
+CATEGORIES = MappingProxyType({
+    'tech': {
+        'name': '💻 Технологии',
+        'emoji': '💻',
+        'rss': (
+            'https://habr.com/ru/rss/hub/python/',
+            'https://3dnews.ru/bitrix/rss.php',
+            'https://www.ixbt.com/export/news.rss',
+            'https://vc.ru/rss'
+        ),
+        'image_keywords': ('технологии', 'компьютер', 'робот'),
+        'fallback_images': (
+            'https://images.unsplash.com/photo-1517430816045-df4b7de11d1d',
+            'https://images.unsplash.com/photo-1558494949-ef010cbdcc31'
+        ),
+        'fallback_articles': (
+            {'title': 'Новые технологии в IT', 'summary': 'Современные технологии развиваются быстрыми темпами...'},
+            {'title': 'Искусственный интеллект', 'summary': 'ИИ меняет наш подход к решению задач...'}
+        )
+    },
+    'politics': {
+        'name': '🏛 Политика',
+        'emoji': '🏛',
+        'rss': (
+            'https://lenta.ru/rss/news',
+            'https://www.kommersant.ru/RSS/news.xml',
+            'https://ria.ru/export/rss2/politics/index.xml',
+            'https://tass.ru/rss/v2.xml'
+        ),
+        'image_keywords': ('политика', 'кремль', 'правительство'),
+        'fallback_images': (
+            'https://images.unsplash.com/photo-1562601579-599dec564e06',
+            'https://images.unsplash.com/photo-1580130732478-4e339fb33746'
+        ),
+        'fallback_articles': (
+            {'title': 'Политические новости', 'summary': 'Важные политические события происходят...'},
+            {'title': 'Международные отношения', 'summary': 'Страны обсуждают новые соглашения...'}
+        )
+    }
+})
+
 class ReliableNewsBot:
     def __init__(self):
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
@@ -43,59 +173,85 @@ class ReliableNewsBot:
         if not self.bot_token:
             raise ValueError("Токен бота не указан в .env файле")
         
-        # Настройки категорий с резервными RSS
-        self.categories = {
-            'tech': {
-                'name': '💻 Технологии',
-                'emoji': '💻',
-                'rss': [
-                    'https://habr.com/ru/rss/hub/python/',
-                    'https://3dnews.ru/bitrix/rss.php',
-                    'https://www.ixbt.com/export/news.rss',
-                    'https://vc.ru/rss'
-                ],
-                'image_keywords': ['технологии', 'компьютер', 'робот'],
-                'fallback_images': [
-                    'https://images.unsplash.com/photo-1517430816045-df4b7de11d1d',
-                    'https://images.unsplash.com/photo-1558494949-ef010cbdcc31'
-                ],
-                'fallback_articles': [
-                    {'title': 'Новые технологии в IT', 'summary': 'Современные технологии развиваются быстрыми темпами...'},
-                    {'title': 'Искусственный интеллект', 'summary': 'ИИ меняет наш подход к решению задач...'}
-                ]
+        self.categories = CATEGORIES
+        # Предвычисленные значения для random.choice без лишних аллокаций
+        self._category_ids = tuple(self.categories.keys())
+        self._any_fallback_image = self.categories['tech']['fallback_images'][0]
+        
+        # Обработчики кнопок главного меню по тексту сообщения
+        self._text_handlers = {
+            RANDOM_BUTTON: self.random_news,
+            **{
+                category['name']: partial(self.process_category, category_id=category_id)
+                for category_id, category in self.categories.items()
             },
-            'politics': {
-                'name': '🏛 Политика',
-                'emoji': '🏛',
-                'rss': [
-                    'https://lenta.ru/rss/news',
-                    'https://www.kommersant.ru/RSS/news.xml',
-                    'https://ria.ru/export/rss2/politics/index.xml',
-                    'https://tass.ru/rss/v2.xml'
-                ],
-                'image_keywords': ['политика', 'кремль', 'правительство'],
-                'fallback_images': [
-                    'https://images.unsplash.com/photo-1562601579-599dec564e06',
-                    'https://images.unsplash.com/photo-1580130732478-4e339fb33746'
+            HELP_BUTTON: self.help_command
+        }
+        
+        # Готовые кнопки действий под новостью для каждой категории
+        category_row = [
+            InlineKeyboardButton(category['name'], callback_data=f"category_{category_id}")
+            for category_id, category in self.categories.items()
+        ]
+        self._markups = {
+            category_id: InlineKeyboardMarkup([
+                [
+                    InlineKeyboardButton("✅ Опубликовать", callback_data="publish"),
+                    InlineKeyboardButton("🔄 Еще новость", callback_data=f"category_{category_id}")
                 ],
-                'fallback_articles': [
-                    {'title': 'Политические новости', 'summary': 'Важные политические события происходят...'},
-                    {'title': 'Международные отношения', 'summary': 'Страны обсуждают новые соглашения...'}
-                ]
-            }
+                category_row
+            ])
+            for category_id in self.categories
         }
         
-        # Настройка сессии requests
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'Mozilla/5.0'})
-        self.current_article = None
+        # Сессия aiohttp создается в setup() внутри цикла событий бота
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Кэш лент: url -> {'ts', 'etag', 'last_modified', 'entries': [(title, link, summary), ...]}
+        self._rss_cache: OrderedDict[str, Dict] = OrderedDict()
+        # Предзагрузка: category_id -> задача и готовая (время, статья, изображение)
+        self._prefetch: Dict[str, asyncio.Task] = {}
+        self._next_article: Dict[str, Tuple[float, Dict, str]] = {}
+        # URL изображения -> file_id в Telegram, чтобы не загружать его повторно
+        self._file_id_cache: OrderedDict[str, str] = OrderedDict()
+
+    async def setup(self, application: Application):
+        """Создание общей HTTP-сессии с пулом соединений"""
+        # Асинхронный DNS через aiodns (системные DNS-серверы), если он установлен
+        try:
+            resolver = aiohttp.AsyncResolver()
+        except Exception as e:
+            logger.warning(f"aiodns недоступен, используется стандартный DNS: {str(e)}")
+            resolver = None
+        
+        self.session = aiohttp.ClientSession(
+            headers={'User-Agent': 'Mozilla/5.0'},
+            connector=aiohttp.TCPConnector(
+                limit=32,
+                limit_per_host=8,
+                ttl_dns_cache=600,
+                keepalive_timeout=60,
+                resolver=resolver
+            ),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+
+    async def shutdown(self, application: Application):
+        """Закрытие HTTP-сессии при остановке бота"""
+        tasks = list(self._prefetch.values())
+        for task in tasks:
+            task.cancel()
+        # Дожидаемся отмены, чтобы задачи не обращались к закрытой сессии
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.session:
+            await self.session.close()
+            self.session = None
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Главное меню с кнопками"""
         buttons = [
-            [KeyboardButton("📰 Случайная новость")],
-            [KeyboardButton("💻 Технологии"), KeyboardButton("🏛 Политика")],
-            [KeyboardButton("ℹ️ Помощь")]
+            [KeyboardButton(RANDOM_BUTTON)],
+            [KeyboardButton(category['name']) for category in self.categories.values()],
+            [KeyboardButton(HELP_BUTTON)]
         ]
         
         reply_markup = ReplyKeyboardMarkup(buttons, resize_keyboard=True)
@@ -112,11 +268,20 @@ class ReliableNewsBot:
         for attempt in range(max_retries):
             try:
                 return await method(*args, **kwargs)
+            except (BadRequest, Forbidden):
+                # Повтор не поможет
+                raise
+            except RetryAfter as e:
+                if attempt == max_retries - 1:
+                    raise
+                # Telegram сам сообщает, сколько ждать
+                delay = e.retry_after
+                await asyncio.sleep(delay.total_seconds() if isinstance(delay, timedelta) else delay)
             except Exception as e:
                 if attempt == max_retries - 1:
                     raise
-                await asyncio.sleep(1)
-                continue
+                # Экспоненциальная задержка с разбросом: 1, 2, 4... секунд
+                await asyncio.sleep(min(8, 2 ** attempt) + random.random() * 0.25)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Команда помощи"""
@@ -137,14 +302,9 @@ class ReliableNewsBot:
         """Обработка текстовых сообщений"""
         text = update.message.text
         
-        if text == "📰 Случайная новость":
-            await self.random_news(update, context)
-        elif text == "💻 Технологии":
-            await self.process_category(update, context, 'tech')
-        elif text == "🏛 Политика":
-            await self.process_category(update, context, 'politics')
-        elif text == "ℹ️ Помощь":
-            await self.help_command(update, context)
+        handler = self._text_handlers.get(text)
+        if handler:
+            await handler(update, context)
         else:
             await self.send_with_retry(
                 update.message.reply_text,
@@ -153,198 +313,345 @@ class ReliableNewsBot:
 
     async def random_news(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Случайная новость из любой категории"""
-        category_id = random.choice(list(self.categories.keys()))
+        category_id = random.choice(self._category_ids)
         await self.process_category(update, context, category_id)
 
     async def process_category(self, update: Update, context: ContextTypes.DEFAULT_TYPE, category_id: str):
         """Обработка выбранной категории с гарантированным результатом"""
         try:
-            # Пытаемся получить свежую новость
-            success = await self.try_get_fresh_article(category_id)
-            
-            if not success:
-                # Если не получилось, используем резервную статью
-                await self.use_fallback_article(category_id)
-            
-            # Получаем изображение (гарантированно будет из fallback)
-            image_url = await self.get_image_with_fallback()
+            # Берем предзагруженную статью или готовим новую
+            article, image_url = await self._take_prepared_article(category_id)
+            context.user_data['current_article'] = article
             
             # Формируем сообщение
             category = self.categories[category_id]
             post_text = (
                 f"{category['emoji']} *{category['name']}*\n\n"
-                f"📌 *{self.current_article['title']}*\n\n"
-                f"{self.current_article['summary']}"
+                f"📌 *{article['title']}*\n\n"
+                f"{article['summary']}"
             )
             
-            # Кнопки действий
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ Опубликовать", callback_data="publish"),
-                    InlineKeyboardButton("🔄 Еще новость", callback_data=f"category_{category_id}")
-                ],
-                [
-                    InlineKeyboardButton("💻 Технологии", callback_data="category_tech"),
-                    InlineKeyboardButton("🏛 Политика", callback_data="category_politics")
-                ]
-            ]
-            
             # Отправка сообщения с повторными попытками
             await self.send_news_message(
                 update,
                 image_url=image_url,
                 caption=post_text,
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                reply_markup=self._markups[category_id],
+                fallback_image=random.choice(category['fallback_images'])
             )
             
+            # Пока пользователь читает, готовим следующую новость
+            self._schedule_prefetch(category_id)
+            
         except Exception as e:
             logger.error(f"Критическая ошибка: {str(e)}")
-            await self.send_with_retry(
-                update.message.reply_text,
-                text="📌 *Технологии*\n\n🔧 Бот временно использует резервные новости. Попробуйте позже!",
-                parse_mode='Markdown'
-            )
-            await self.use_fallback_article('tech')
-            await self.process_category(update, context, 'tech')
+            
+            # Во время сбоя не засыпаем пользователя одинаковыми сообщениями
+            now = time.monotonic()
+            last_error_ts = context.chat_data.get('last_error_ts')
+            if last_error_ts is not None and now - last_error_ts < ERROR_NOTICE_INTERVAL:
+                return
+            context.chat_data['last_error_ts'] = now
+            
+            # Единственная резервная отправка, без повторного вызова process_category
+            try:
+                await self.send_photo_cached(
+                    update.message.reply_photo,
+                    self._any_fallback_image,
+                    caption="📌 *Технологии*\n\n🔧 Бот временно использует резервные новости. Попробуйте позже!",
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                logger.error(f"Ошибка отправки резервного сообщения: {str(e)}")
+
+    async def _prepare_article(self, category_id: str) -> Tuple[Dict, str]:
+        """Подготовка статьи и изображения для категории"""
+        # Пытаемся получить свежую новость, иначе используем резервную
+        article = await self.try_get_fresh_article(category_id)
+        if not article:
+            article = await self.use_fallback_article(category_id)
+        
+        # Получаем изображение (гарантированно будет из fallback)
+        image_url = await self.get_image_with_fallback(article)
+        return article, image_url
+
+    async def _take_prepared_article(self, category_id: str) -> Tuple[Dict, str]:
+        """Получение предзагруженной статьи или подготовка новой"""
+        # Если предзагрузка еще идет, дожидаемся ее вместо повторного запроса
+        task = self._prefetch.get(category_id)
+        if task and category_id not in self._next_article:
+            await asyncio.wait({task})
+        
+        prepared = self._next_article.pop(category_id, None)
+        if prepared and time.monotonic() - prepared[0] < RSS_CACHE_TTL:
+            return prepared[1], prepared[2]
+        return await self._prepare_article(category_id)
 
-    async def try_get_fresh_article(self, category_id: str) -> bool:
+    def _schedule_prefetch(self, category_id: str):
+        """Запуск фоновой подготовки следующей статьи"""
+        if category_id in self._prefetch or category_id in self._next_article:
+            return
+        if len(self._prefetch) >= PREFETCH_LIMIT:
+            return
+        
+        task = asyncio.create_task(self._prefetch_article(category_id))
+        self._prefetch[category_id] = task
+        task.add_done_callback(lambda _: self._prefetch.pop(category_id, None))
+
+    async def _prefetch_article(self, category_id: str):
+        """Фоновая предзагрузка статьи в слот категории"""
+        try:
+            article, image_url = await self._prepare_article(category_id)
+            # Резервную статью не сохраняем: после восстановления лент она бы вытесняла свежие
+            if not article.get('is_fallback'):
+                self._next_article[category_id] = (time.monotonic(), article, image_url)
+        except Exception as e:
+            logger.warning(f"Ошибка предзагрузки {category_id}: {str(e)}")
+
+    async def try_get_fresh_article(self, category_id: str) -> Optional[Dict]:
         """Попытка получить свежую статью из RSS"""
         category = self.categories.get(category_id)
         if not category:
-            return False
+            return None
         
+        # Повторные клики обслуживаем из кэша, вообще без сетевых запросов
+        now = time.monotonic()
         for rss_url in category['rss']:
-            try:
-                response = await asyncio.to_thread(
-                    self.session.get, rss_url, timeout=10
-                )
-                response.raise_for_status()
-                
-                feed = feedparser.parse(response.content)
-                if not feed.entries:
+            cached = self._rss_cache.get(rss_url)
+            if cached and cached['entries'] and now - cached['ts'] < RSS_CACHE_TTL:
+                self._rss_cache.move_to_end(rss_url)
+                return self._article_from_entries(cached['entries'], category_id)
+        
+        # Запрашиваем все ленты параллельно и берем первую удачную
+        tasks = [
+            asyncio.create_task(self._fetch_one_rss(rss_url, category_id), name=rss_url)
+            for rss_url in category['rss']
+        ]
+        try:
+            article = await asyncio.wait_for(self._first_article(tasks), timeout=RSS_TOTAL_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Таймаут RSS для категории {category_id}")
+            return None
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # Забираем результаты всех задач, чтобы их ошибки не терялись
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return article
+
+    async def _first_article(self, tasks: List[asyncio.Task]) -> Optional[Dict]:
+        """Ожидание первой задачи, вернувшей статью"""
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception():
+                    logger.warning(f"Ошибка RSS {task.get_name()}: {str(task.exception())}")
                     continue
-                
-                entry = random.choice(feed.entries[:10])  # Берем из свежих
-                
-                # Очистка HTML
-                summary = getattr(entry, 'summary', entry.get('description', ''))
-                soup = BeautifulSoup(summary, 'html.parser')
-                clean_text = soup.get_text(separator=' ', strip=True)
-                
-                # Умное сокращение
-                clean_text = clean_text[:250] + '...' if len(clean_text) > 250 else clean_text
-                
-                self.current_article = {
-                    'title': entry.title,
-                    'link': entry.link,
-                    'summary': clean_text,
-                    'category': category_id,
-                    'is_fallback': False
-                }
-                return True
-                
-            except Exception as e:
-                logger.warning(f"Ошибка RSS {rss_url}: {str(e)}")
-                continue
+                if task.result():
+                    return task.result()
+        return None
+
+    async def _get_feed(self, rss_url: str, ttl: float = RSS_CACHE_TTL) -> List[Tuple[str, str, str]]:
+        """Получение свежих записей ленты с кэшированием"""
+        cached = self._rss_cache.get(rss_url)
+        if cached and time.monotonic() - cached['ts'] < ttl:
+            self._rss_cache.move_to_end(rss_url)
+            return cached['entries']
+        
+        # Условный запрос: неизменившаяся лента вернет 304 без тела
+        headers = {}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        
+        async with self.session.get(rss_url, headers=headers) as response:
+            if response.status == 304 and cached:
+                cached['ts'] = time.monotonic()
+                self._rss_cache.move_to_end(rss_url)
+                return cached['entries']
+            response.raise_for_status()
+            content = await response.read()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+        
+        # Храним только нужные поля, а не весь FeedParserDict
+        entries = _parse_feed(content)
+        
+        self._rss_cache[rss_url] = {
+            'ts': time.monotonic(),
+            'etag': etag,
+            'last_modified': last_modified,
+            'entries': entries
+        }
+        self._rss_cache.move_to_end(rss_url)
+        if len(self._rss_cache) > RSS_CACHE_SIZE:
+            self._rss_cache.popitem(last=False)
+        return entries
+
+    async def _fetch_one_rss(self, rss_url: str, category_id: str) -> Optional[Dict]:
+        """Загрузка одной RSS-ленты и выбор статьи из нее"""
+        return self._article_from_entries(await self._get_feed(rss_url), category_id)
+
+    def _article_from_entries(self, entries: List[Tuple[str, str, str]], category_id: str) -> Optional[Dict]:
+        """Выбор случайной статьи из свежих записей ленты"""
+        n = min(10, len(entries))
+        if not n:
+            return None
+        
+        title, link, summary = entries[random.randrange(n)]  # Берем из свежих
+        
+        # Очистка HTML
+        clean_text = _SPACE_RE.sub(' ', html.unescape(_TAG_RE.sub(' ', summary))).strip()
         
-        return False
+        # Умное сокращение
+        clean_text = clean_text[:250] + '...' if len(clean_text) > 250 else clean_text
+        
+        return {
+            'title': title,
+            'link': link,
+            'summary': clean_text,
+            'category': category_id,
+            'is_fallback': False
+        }
 
-    async def use_fallback_article(self, category_id: str):
+    async def use_fallback_article(self, category_id: str) -> Dict:
         """Использование резервной статьи"""
         category = self.categories[category_id]
-        self.current_article = random.choice(category['fallback_articles'])
-        self.current_article.update({
+        # Копируем, чтобы не менять шаблон в настройках категории
+        article = dict(random.choice(category['fallback_articles']))
+        article.update({
             'category': category_id,
             'is_fallback': True
         })
+        return article
 
-    async def get_image_with_fallback(self) -> str:
+    async def get_image_with_fallback(self, article: Optional[Dict]) -> str:
         """Получение изображения с резервными вариантами"""
-        if not self.current_article:
-            return random.choice(list(self.categories.values()))['fallback_images'][0]
+        if not article:
+            return self._any_fallback_image
         
-        category = self.categories[self.current_article['category']]
+        category = self.categories[article['category']]
         
         # 1. Пробуем извлечь из статьи (если не fallback)
-        if not self.current_article.get('is_fallback', True):
+        if not article.get('is_fallback', True):
             try:
-                img = await self.extract_image_from_article()
+                img = await self.extract_image_from_article(article)
                 if img:
                     return img
             except Exception as e:
                 logger.warning(f"Ошибка извлечения изображения: {str(e)}")
         
-        # 2. Пробуем Unsplash
-        try:
+        # 2. Unsplash по ключевому слову (Telegram сам загрузит картинку)
+        if category['image_keywords']:
             keyword = random.choice(category['image_keywords'])
-            url = f"https://source.unsplash.com/800x600/?{keyword}"
-            
-            resp = await asyncio.to_thread(self.session.head, url, timeout=5)
-            if resp.status_code == 200:
-                return url
-        except Exception as e:
-            logger.warning(f"Ошибка Unsplash: {str(e)}")
+            return f"https://source.unsplash.com/800x600/?{keyword}"
         
         # 3. Fallback изображение
         return random.choice(category['fallback_images'])
 
-    async def extract_image_from_article(self) -> Optional[str]:
+    async def extract_image_from_article(self, article: Dict) -> Optional[str]:
         """Извлечение изображения из статьи"""
-        if not self.current_article or not self.current_article.get('link'):
+        if not article or not article.get('link'):
             return None
             
         try:
-            response = await asyncio.to_thread(
-                self.session.get, self.current_article['link'], timeout=10
+            async with self.session.get(article['link']) as response:
+                page = b''
+                async for chunk in response.content.iter_chunked(ARTICLE_READ_LIMIT):
+                    page += chunk
+                    if len(page) >= ARTICLE_READ_LIMIT:
+                        break
+                charset = response.charset
+            # Строим дерево только из тегов meta и img
+            soup = BeautifulSoup(
+                page[:ARTICLE_READ_LIMIT], 'lxml',
+                parse_only=SoupStrainer(['meta', 'img']),
+                from_encoding=charset
             )
-            soup = BeautifulSoup(response.text, 'html.parser')
             
             # Ищем OpenGraph или Twitter изображение
-            for meta in soup.find_all('meta'):
-                if meta.get('property') in ['og:image', 'twitter:image']:
-                    if meta.get('content', '').startswith('http'):
-                        return meta['content']
+            for meta in soup.select(_OG_IMAGE_SELECTOR):
+                if meta.get('content', '').startswith('http'):
+                    return meta['content']
             
-            # Ищем первое подходящее изображение в статье
-            for img in soup.find_all('img', src=True):
-                if img['src'].startswith('http') and any(ext in img['src'] for ext in ['.jpg', '.jpeg', '.png']):
+            # Ищем первое подходящее изображение в статье (не дальше 20 тегов)
+            for img in soup.find_all('img', src=True, limit=20):
+                if img['src'].startswith('http') and any(ext in img['src'] for ext in _IMG_EXT):
                     return img['src']
         except Exception as e:
             logger.warning(f"Ошибка парсинга статьи: {str(e)}")
             return None
 
-    async def send_news_message(self, update, image_url: str, caption: str, reply_markup=None):
-        """Безопасная отправка новости"""
-        try:
-            if isinstance(update, Update):
-                # Новое сообщение
-                await self.send_with_retry(
-                    update.message.reply_photo,
-                    photo=image_url,
+    def _remember_file_id(self, image_url: str, message):
+        """Сохранение file_id отправленного изображения"""
+        if getattr(message, 'photo', None):
+            self._file_id_cache[image_url] = message.photo[-1].file_id
+            self._file_id_cache.move_to_end(image_url)
+            if len(self._file_id_cache) > FILE_ID_CACHE_SIZE:
+                self._file_id_cache.popitem(last=False)
+
+    async def send_photo_cached(self, method, image_url: str, **kwargs):
+        """Отправка фото по file_id, если изображение уже загружалось"""
+        message = await self.send_with_retry(
+            method,
+            photo=self._file_id_cache.get(image_url, image_url),
+            **kwargs
+        )
+        self._remember_file_id(image_url, message)
+        return message
+
+    async def _send_news_photo(self, update, image_url: str, caption: str, reply_markup=None):
+        """Отправка новости с изображением"""
+        if isinstance(update, Update):
+            # Новое сообщение
+            await self.send_photo_cached(
+                update.message.reply_photo,
+                image_url,
+                caption=caption,
+                reply_markup=reply_markup,
+                parse_mode='Markdown'
+            )
+        else:
+            # Редактирование существующего
+            message = await self.send_with_retry(
+                update.edit_message_media,
+                media=InputMediaPhoto(
+                    media=self._file_id_cache.get(image_url, image_url),
                     caption=caption,
-                    reply_markup=reply_markup,
                     parse_mode='Markdown'
-                )
-            else:
-                # Редактирование существующего
-                await self.send_with_retry(
-                    update.edit_message_media,
-                    media=InputMediaPhoto(
-                        media=image_url,
-                        caption=caption,
-                        parse_mode='Markdown'
-                    ),
-                    reply_markup=reply_markup
-                )
+                ),
+                reply_markup=reply_markup
+            )
+            self._remember_file_id(image_url, message)
+
+    async def send_news_message(self, update, image_url: str, caption: str, reply_markup=None,
+                                fallback_image: Optional[str] = None):
+        """Безопасная отправка новости"""
+        try:
+            await self._send_news_photo(update, image_url, caption, reply_markup)
+            return
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения: {str(e)}")
-            # Последняя попытка - только текст
-            await self.send_with_retry(
-                update.message.reply_text if isinstance(update, Update) else update.edit_message_text,
-                text=caption,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
+        
+        # Повтор с резервным изображением категории
+        if fallback_image and fallback_image != image_url:
+            try:
+                await self._send_news_photo(update, fallback_image, caption, reply_markup)
+                return
+            except Exception as e:
+                logger.error(f"Ошибка отправки с резервным изображением: {str(e)}")
+        
+        # Последняя попытка - только текст
+        await self.send_with_retry(
+            update.message.reply_text if isinstance(update, Update) else update.edit_message_text,
+            text=caption,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
 
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка callback-запросов"""
@@ -356,7 +663,7 @@ class ReliableNewsBot:
                 category_id = query.data.split('_')[1]
                 await self.process_category(query, context, category_id)
             elif query.data == "publish":
-                await self.publish_article(query, context)
+                await self.publish_article(query, context, context.user_data.get('current_article'))
         except Exception as e:
             logger.error(f"Ошибка callback: {str(e)}")
             await self.send_with_retry(
@@ -364,9 +671,9 @@ class ReliableNewsBot:
                 text="⚠️ Произошла ошибка. Попробуйте еще раз."
             )
 
-    async def publish_article(self, query, context: ContextTypes.DEFAULT_TYPE):
+    async def publish_article(self, query, context: ContextTypes.DEFAULT_TYPE, article: Optional[Dict]):
         """Публикация статьи в канал"""
-        if not self.current_article:
+        if not article:
             await self.send_with_retry(
                 query.edit_message_text,
                 text="⚠️ Нет данных для публикации"
@@ -374,22 +681,33 @@ class ReliableNewsBot:
             return
         
         try:
-            category = self.categories[self.current_article['category']]
-            image_url = await self.get_image_with_fallback()
+            category = self.categories[article['category']]
+            image_url = await self.get_image_with_fallback(article)
             
             post_text = (
                 f"{category['emoji']} *{category['name']}*\n\n"
-                f"📌 *{self.current_article['title']}*\n\n"
-                f"{self.current_article['summary']}"
+                f"📌 *{article['title']}*\n\n"
+                f"{article['summary']}"
             )
             
-            await self.send_with_retry(
-                context.bot.send_photo,
-                chat_id=self.channel_id,
-                photo=image_url,
-                caption=post_text,
-                parse_mode='Markdown'
-            )
+            try:
+                await self.send_photo_cached(
+                    context.bot.send_photo,
+                    image_url,
+                    chat_id=self.channel_id,
+                    caption=post_text,
+                    parse_mode='Markdown'
+                )
+            except Exception as e:
+                # Telegram не смог загрузить изображение - публикуем с резервным
+                logger.warning(f"Ошибка отправки изображения {image_url}: {str(e)}")
+                await self.send_photo_cached(
+                    context.bot.send_photo,
+                    random.choice(category['fallback_images']),
+                    chat_id=self.channel_id,
+                    caption=post_text,
+                    parse_mode='Markdown'
+                )
             
             await self.send_with_retry(
                 query.edit_message_text,
@@ -397,7 +715,7 @@ class ReliableNewsBot:
                 parse_mode='Markdown'
             )
             
-            self.current_article = None
+            context.user_data.pop('current_article', None)
         except Exception as e:
             logger.error(f"Ошибка публикации: {str(e)}")
             await self.send_with_retry(
@@ -407,7 +725,13 @@ class ReliableNewsBot:
 
     def run(self):
         """Запуск бота с обработчиками"""
-        app = Application.builder().token(self.bot_token).build()
+        app = (
+            Application.builder()
+            .token(self.bot_token)
+            .post_init(self.setup)
+            .post_shutdown(self.shutdown)
+            .build()
+        )
         
         # Команды
         app.add_handler(CommandHandler("start", self.start))
@@ -420,6 +744,13 @@ class ReliableNewsBot:
         # Обработчики callback
         app.add_handler(CallbackQueryHandler(self.handle_callback))
         
+        # Более быстрый цикл событий, если установлен uvloop (нет под Windows)
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            logger.info("uvloop не установлен, используется стандартный asyncio")
+        
         logger.info("Бот запущен и готов к работе")
         app.run_polling()
 